@@ -4,12 +4,12 @@ Command Line Interface for Image Generation
 
 import argparse
 import sys
-from generator import HighResImageGenerator
-from deepzoom_generator import DeepZoomGenerator, generate_deepzoom_vips
 
 
 def interactive_menu():
     """Interactive menu for image generation"""
+    from generator import HighResImageGenerator
+
     print("\n" + "="*60)
     print("HIGH RESOLUTION IMAGE GENERATOR")
     print("="*60 + "\n")
@@ -58,6 +58,8 @@ def interactive_menu():
 
         generate_dz = input("\nGenerate Deep Zoom tiles? (y/n): ").lower()
         if generate_dz == 'y':
+            from deepzoom_generator import DeepZoomGenerator
+
             output_dir = input("Output directory (default: output/deepzoom_tiles): ") or "output/deepzoom_tiles"
             print("\nGenerating Deep Zoom tiles...")
             dz = DeepZoomGenerator(filepath, output_dir)
@@ -110,6 +112,9 @@ Examples:
         interactive_menu()
         return
 
+    # Deferred so --help does not pay for NumPy/PIL/numba imports
+    from generator import HighResImageGenerator
+
     # Generate image
     print(f"\n{'='*60}")
     print(f"Generating {args.type} image at {args.width}x{args.height}")
@@ -133,6 +138,8 @@ Examples:
     filepath = generator.save_image(img, args.output, args.format)
 
     if args.deepzoom:
+        from deepzoom_generator import DeepZoomGenerator
+
         print("\nGenerating Deep Zoom tiles...")
         dz = DeepZoomGenerator(filepath, args.dz_output)
         dz.generate_tiles()
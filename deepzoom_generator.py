@@ -3,10 +3,29 @@ Deep Zoom Tile Generator
 Generates OpenSeadragon-compatible tile pyramids
 """
 
+import io
 import os
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 from PIL import Image
 import math
 
+try:
+    from turbojpeg import TurboJPEG, TJPF_RGB, TJSAMP_420
+    _TJ = TurboJPEG()
+except (ImportError, OSError, RuntimeError):
+    # Module missing, or libturbojpeg itself could not be located
+    _TJ = None
+
+try:
+    from tqdm import tqdm
+except ImportError:
+    tqdm = None
+
+# Levels whose larger side fits within this many pixels are queued without waiting
+SMALL_LEVEL_SIZE = 1024
+
 class DeepZoomGenerator:
     def __init__(self, image_path, output_dir, tile_size=256, overlap=1, image_format='jpg'):
         """
@@ -27,21 +46,81 @@ class DeepZoomGenerator:
         self.img = Image.open(image_path)
         self.width, self.height = self.img.size
 
+        # Pyramid geometry is fixed per source image, so compute it once
+        self._num_levels = math.ceil(math.log2(max(self.width, self.height))) + 1
+        self._max_level = self._num_levels - 1
+        self._level_dims = [
+            (math.ceil(self.width / 2 ** (self._max_level - level)),
+             math.ceil(self.height / 2 ** (self._max_level - level)))
+            for level in range(self._num_levels)
+        ]
+
     def get_num_levels(self):
         """Calculate number of zoom levels needed"""
-        max_dimension = max(self.width, self.height)
-        return math.ceil(math.log2(max_dimension)) + 1
+        return self._num_levels
 
     def get_scale_dimensions(self, level):
         """Get dimensions for a specific level"""
-        max_level = self.get_num_levels() - 1
-        scale = 2 ** (max_level - level)
-        width = math.ceil(self.width / scale)
-        height = math.ceil(self.height / scale)
-        return width, height
+        return self._level_dims[level]
+
+    def get_cache_key(self):
+        """Key identifying the source file and tiling settings"""
+        stat = os.stat(self.image_path)
+        key = (f"{os.path.abspath(self.image_path)}|{stat.st_mtime_ns}|{stat.st_size}|"
+               f"{self.tile_size}|{self.overlap}|{self.image_format}")
+        return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
+    def get_dzi_path(self):
+        """Path of the DZI descriptor next to the tiles directory"""
+        dzi_filename = os.path.basename(self.output_dir) + '.dzi'
+        return os.path.join(os.path.dirname(self.output_dir), dzi_filename)
+
+    def get_cache_path(self):
+        """Path of the cache marker, stored next to the DZI descriptor"""
+        cache_filename = os.path.basename(self.output_dir) + '.cache_key'
+        return os.path.join(os.path.dirname(self.output_dir), cache_filename)
+
+    def is_cached(self, cache_key):
+        """Check whether tiles for cache_key already exist on disk"""
+        cache_path = self.get_cache_path()
+        if not os.path.exists(cache_path) or not os.path.exists(self.get_dzi_path()):
+            return False
+
+        with open(cache_path) as f:
+            stored_key, _, tiles_dir = f.read().strip().partition('\n')
+
+        return stored_key == cache_key and os.path.isdir(tiles_dir)
+
+    def invalidate_cache(self):
+        """Remove the cache marker and DZI before any tile is rewritten"""
+        for path in (self.get_cache_path(), self.get_dzi_path()):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def write_cache_key(self, cache_key, tiles_dir):
+        """Record cache_key and the tiles directory once generation succeeds"""
+        with open(self.get_cache_path(), 'w') as f:
+            f.write(f"{cache_key}\n{tiles_dir}\n")
 
     def generate_tiles(self):
         """Generate all tiles for all zoom levels"""
+        cache_key = self.get_cache_key()
+        if self.is_cached(cache_key):
+            print(f"\n✓ Deep Zoom tiles up to date: {self.get_dzi_path()}")
+            return
+
+        # A run interrupted after this point leaves no marker, so it cannot be
+        # mistaken for a complete set of tiles
+        self.invalidate_cache()
+
+        # libvips streams the pyramid with worker threads; use PIL only without it
+        if generate_deepzoom_vips(self.image_path, self.output_dir,
+                                  tile_size=self.tile_size, overlap=self.overlap,
+                                  image_format=self.image_format):
+            # dzsave writes <output_dir>.dzi plus tiles under <output_dir>_files
+            self.write_cache_key(cache_key, self.output_dir + '_files')
+            return
+
         num_levels = self.get_num_levels()
 
         print(f"\n{'='*60}")
@@ -52,34 +131,95 @@ class DeepZoomGenerator:
         print(f"Generating {num_levels} zoom levels...")
         print(f"{'='*60}\n")
 
-        for level in range(num_levels):
-            self.generate_level(level)
+        # Build the pyramid top-down, halving the previous level with a box filter
+        # instead of resampling the full-resolution source for every level
+        scaled_img = self.img
+        small_levels = []
+        progress = tqdm(total=num_levels, desc="Pyramid levels", unit="level") if tqdm is not None else None
+
+        # One encode pool and one writer pool are shared by every level
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as writer, \
+                ThreadPoolExecutor(max_workers=os.cpu_count()) as encoder:
+            for level in range(num_levels - 1, -1, -1):
+                level_size = self.get_scale_dimensions(level)
+                if scaled_img.size != level_size:
+                    scaled_img = scaled_img.resize(level_size, Image.Resampling.BOX)
+
+                if max(level_size) <= SMALL_LEVEL_SIZE:
+                    # Small levels hold only a few tiles each: queue them without
+                    # waiting, so they encode while the next levels are downscaled
+                    small_levels.append(self._submit_level(level, scaled_img, encoder, writer))
+                else:
+                    # Large levels run one at a time to bound memory use
+                    self.generate_level(level, scaled_img, encoder, writer)
+                    if progress is not None:
+                        progress.update()
+
+            for encodes in small_levels:
+                _wait_for_tiles(encodes)
+                if progress is not None:
+                    progress.update()
+
+        if progress is not None:
+            progress.close()
 
         self.generate_dzi_descriptor()
+        self.write_cache_key(cache_key, self.output_dir)
         print(f"\n{'='*60}")
         print("✓ Deep Zoom generation complete!")
         print(f"{'='*60}\n")
 
-    def generate_level(self, level):
-        """Generate tiles for a specific zoom level"""
+    def generate_level(self, level, scaled_img=None, encoder=None, writer=None):
+        """
+        Generate tiles for a specific zoom level
+
+        Args:
+            level: Zoom level to generate
+            scaled_img: Source already scaled to this level (resampled from
+                the original image if omitted)
+            encoder: Executor that crops and encodes tiles
+            writer: Executor that writes encoded tiles to disk; temporary
+                pools are created when either executor is omitted
+        """
+        if encoder is None or writer is None:
+            with ThreadPoolExecutor(max_workers=os.cpu_count()) as writer, \
+                    ThreadPoolExecutor(max_workers=os.cpu_count()) as encoder:
+                return self.generate_level(level, scaled_img, encoder, writer)
+
+        _wait_for_tiles(self._submit_level(level, scaled_img, encoder, writer))
+
+    def _submit_level(self, level, scaled_img, encoder, writer):
+        """Queue every tile of a level on encoder and return the encode futures"""
         level_width, level_height = self.get_scale_dimensions(level)
 
-        scaled_img = self.img.resize((level_width, level_height), Image.Resampling.LANCZOS)
+        if scaled_img is None:
+            scaled_img = self.img.resize((level_width, level_height), Image.Resampling.LANCZOS)
 
         cols = math.ceil(level_width / self.tile_size)
         rows = math.ceil(level_height / self.tile_size)
 
-        print(f"Level {level:2d}: {level_width:5d}x{level_height:5d} ({cols:3d}x{rows:3d} tiles)")
+        log = tqdm.write if tqdm is not None else print
+        log(f"Level {level:2d}: {level_width:5d}x{level_height:5d} ({cols:3d}x{rows:3d} tiles)")
 
         level_dir = os.path.join(self.output_dir, str(level))
         os.makedirs(level_dir, exist_ok=True)
 
-        for col in range(cols):
-            for row in range(rows):
-                self.save_tile(scaled_img, level, col, row, level_width, level_height)
+        # Pillow releases the GIL while encoding, so tiles can be saved in parallel
+        scaled_img.load()
+
+        # Encoded bytes go to the writer pool so disk I/O overlaps encoding
+        return [encoder.submit(self.save_tile, scaled_img, level, col, row,
+                               level_width, level_height, writer)
+                for col in range(cols) for row in range(rows)]
 
-    def save_tile(self, img, level, col, row, level_width, level_height):
-        """Save a single tile"""
+    def save_tile(self, img, level, col, row, level_width, level_height, writer=None):
+        """
+        Save a single tile
+
+        Args:
+            writer: Optional executor to hand the encoded file write to; the
+                returned future completes once the tile is on disk
+        """
         x = col * self.tile_size
         y = row * self.tile_size
 
@@ -92,10 +232,24 @@ class DeepZoomGenerator:
 
         tile_path = os.path.join(self.output_dir, str(level), f"{col}_{row}.{self.image_format}")
 
-        if self.image_format == 'jpg':
-            tile.save(tile_path, 'JPEG', quality=90, optimize=True)
+        if self.image_format == 'jpg' and _TJ is not None and tile.mode == 'RGB':
+            # 4:2:0 matches Pillow's subsampling at this quality, so tiles agree across backends
+            data = _TJ.encode(np.asarray(tile), quality=90, pixel_format=TJPF_RGB,
+                              jpeg_subsample=TJSAMP_420)
         else:
-            tile.save(tile_path, 'PNG', optimize=True)
+            buf = io.BytesIO()
+            if self.image_format == 'jpg':
+                # JPEG Huffman optimization costs more than it saves on small tiles
+                tile.save(buf, 'JPEG', quality=90, optimize=False)
+            else:
+                tile.save(buf, 'PNG', optimize=True)
+            data = buf.getvalue()
+
+        if writer is None:
+            _write_bytes(tile_path, data)
+            return None
+
+        return writer.submit(_write_bytes, tile_path, data)
 
     def generate_dzi_descriptor(self):
         """Generate DZI XML descriptor file"""
@@ -107,8 +261,7 @@ class DeepZoomGenerator:
     <Size Width="{self.width}" Height="{self.height}"/>
 </Image>"""
 
-        dzi_filename = os.path.basename(self.output_dir) + '.dzi'
-        dzi_path = os.path.join(os.path.dirname(self.output_dir), dzi_filename)
+        dzi_path = self.get_dzi_path()
 
         with open(dzi_path, 'w') as f:
             f.write(dzi_content)
@@ -116,38 +269,55 @@ class DeepZoomGenerator:
         print(f"\n✓ DZI descriptor saved: {dzi_path}")
 
 
-def generate_deepzoom_vips(input_path, output_dir):
+def _wait_for_tiles(encodes):
+    """Block until every encoded tile has been written, re-raising failures"""
+    for encode in encodes:
+        encode.result().result()
+
+
+def _write_bytes(path, data):
+    """Write an encoded tile to disk"""
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def generate_deepzoom_vips(input_path, output_dir, tile_size=256, overlap=1, image_format='jpg'):
     """
     Generate Deep Zoom tiles using VIPS (faster for huge images)
     Requires: pip install pyvips
+
+    Returns:
+        True on success, False if pyvips or libvips is not available
     """
     try:
         import pyvips
+    except (ImportError, OSError):
+        # pyvips missing, or installed without the libvips shared library
+        print("pyvips/libvips not available, using PIL tile generation "
+              "(install libvips and pyvips for faster tiling)")
+        return False
 
-        print(f"\n{'='*60}")
-        print("DEEP ZOOM GENERATION (VIPS - Fast Mode)")
-        print(f"{'='*60}\n")
+    print(f"\n{'='*60}")
+    print("DEEP ZOOM GENERATION (VIPS - Fast Mode)")
+    print(f"{'='*60}\n")
 
-        image = pyvips.Image.new_from_file(input_path)
+    image = pyvips.Image.new_from_file(input_path)
 
-        print(f"Source: {input_path}")
-        print(f"Size: {image.width}x{image.height}")
-        print("Generating tiles...")
+    print(f"Source: {input_path}")
+    print(f"Size: {image.width}x{image.height}")
+    print("Generating tiles...")
 
-        image.dzsave(
-            output_dir,
-            suffix='.jpg[Q=90]',
-            tile_size=256,
-            overlap=1,
-            depth='onetile'
-        )
+    suffix = '.jpg[Q=90]' if image_format == 'jpg' else '.png'
 
-        print(f"\n✓ Deep Zoom tiles generated in {output_dir}")
-        print(f"{'='*60}\n")
+    image.dzsave(
+        output_dir,
+        suffix=suffix,
+        tile_size=tile_size,
+        overlap=overlap,
+        depth='onetile'
+    )
 
-    except ImportError:
-        print("Error: pyvips not installed. Install with: pip install pyvips")
-        print("Falling back to PIL method...")
-        return False
+    print(f"\n✓ Deep Zoom tiles generated in {output_dir}")
+    print(f"{'='*60}\n")
 
     return True
@@ -7,8 +7,134 @@ import numpy as np
 from PIL import Image, ImageDraw, ImageFilter
 import random
 import os
-from datetime import datetime
-import colorsys
+import functools
+
+# Voronoi diagrams with more sites than this use a KD-tree when scipy is available
+KDTREE_MIN_POINTS = 500
+
+
+@functools.lru_cache(maxsize=None)
+def _get_voronoi_kernel():
+    """Compile the Numba Voronoi kernel on first use; None without numba"""
+    try:
+        from numba import njit, prange
+    except ImportError:
+        return None
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _voronoi_kernel(px, py, colors, out):
+        """Fill out with the color of the nearest site for every pixel"""
+        height, width, _ = out.shape
+        for y in prange(height):
+            for x in range(width):
+                best = 0
+                best_dist = np.iinfo(np.int64).max
+                for k in range(px.shape[0]):
+                    dx = x - px[k]
+                    dy = y - py[k]
+                    dist = dx * dx + dy * dy
+                    if dist < best_dist:
+                        best_dist = dist
+                        best = k
+                out[y, x, 0] = colors[best, 0]
+                out[y, x, 1] = colors[best, 1]
+                out[y, x, 2] = colors[best, 2]
+
+    return _voronoi_kernel
+
+
+def _hsv_to_rgb(hue):
+    """Vectorized HSV to RGB conversion for full saturation and value
+
+    Args:
+        hue: Array of hues in [0, 1]
+
+    Returns:
+        uint8 array with a trailing RGB axis, matching colorsys.hsv_to_rgb
+    """
+    h6 = np.asarray(hue) * 6.0
+    sextant = h6.astype(np.int32)
+    f = h6 - sextant
+    sextant %= 6
+
+    one = np.ones_like(f)
+    zero = np.zeros_like(f)
+    conditions = [sextant == i for i in range(5)]
+
+    r = np.select(conditions, [one, 1 - f, zero, zero, f], one)
+    g = np.select(conditions, [f, one, one, 1 - f, zero], zero)
+    b = np.select(conditions, [zero, zero, f, one, one], 1 - f)
+
+    return (np.stack([r, g, b], axis=-1) * 255).astype(np.uint8)
+
+
+def _build_hsv_lut(size):
+    """Build a (size, 3) uint8 palette of fully saturated hues over [0, 1]"""
+    return _hsv_to_rgb(np.arange(size, dtype=np.float64) / (size - 1))
+
+
+_HSV_LUT = _build_hsv_lut(4096)
+
+
+def _hue_to_rgb(hue):
+    """Map an array of hues in [0, 1] to RGB with a single palette lookup"""
+    size = len(_HSV_LUT)
+    idx = np.minimum((hue * (size - 1)).astype(np.int32), size - 1)
+    return _HSV_LUT[idx]
+
+
+def _mandelbrot_iters(x, y, max_iter):
+    """Escape-time iteration counts for the grid spanned by x and y"""
+    c = x[None, :] + 1j * y[:, None]
+    z = np.zeros_like(c)
+    iters = np.zeros(c.shape, dtype=np.int32)
+
+    for _ in range(max_iter):
+        mask = (z.real * z.real + z.imag * z.imag) <= 4
+        if not mask.any():
+            break
+        z[mask] = z[mask] * z[mask] + c[mask]
+        iters[mask] += 1
+
+    return iters
+
+
+def _mandelbrot_iters_gpu(cp, x, y, max_iter):
+    """CuPy version of _mandelbrot_iters; returns a NumPy array"""
+    c = cp.asarray(x)[None, :] + 1j * cp.asarray(y)[:, None]
+    z = cp.zeros_like(c)
+    iters = cp.zeros(c.shape, dtype=cp.int32)
+
+    # Masked updates via where keep the loop free of host synchronisation
+    for _ in range(max_iter):
+        mask = (z.real * z.real + z.imag * z.imag) <= 4
+        z = cp.where(mask, z * z + c, z)
+        iters += mask
+
+    return iters.get()
+
+
+@functools.lru_cache(maxsize=None)
+def _get_cupy():
+    """Import CuPy on first use; None unless its GPU kernels actually run"""
+    try:
+        import cupy as cp
+        if cp.cuda.runtime.getDeviceCount() == 0:
+            return None
+    except (ImportError, OSError, RuntimeError):
+        # CuPy missing, or installed without a usable CUDA device/driver
+        return None
+
+    # Kernels compile on first launch, so NVRTC or missing-library failures only
+    # show up here; run a 1x1 render once to catch them before the real one
+    try:
+        _mandelbrot_iters_gpu(cp, np.zeros(1), np.zeros(1), 1)
+    except Exception as e:
+        print(f"CuPy is installed but GPU rendering failed ({e}); using NumPy")
+        return None
+
+    return cp
+
 
 class HighResImageGenerator:
     def __init__(self, width=16000, height=16000):
@@ -32,46 +158,63 @@ class HighResImageGenerator:
                 tuple(random.randint(0, 255) for _ in range(3))
             ]
 
-        img = Image.new('RGB', (self.width, self.height))
-        draw = ImageDraw.Draw(img)
+        c0 = np.array(colors[0], dtype=np.float64)
+        c1 = np.array(colors[1], dtype=np.float64)
+
+        # The colour depends on one coordinate only: build a (length, 3) LUT
+        # and broadcast it, so the full canvas is a single store
+        length = self.width if direction == 'horizontal' else self.height
+        t = (np.arange(length, dtype=np.float64) / length)[:, None]
+        lut = (c0 * (1 - t) + c1 * t).astype(np.uint8)
 
         if direction == 'horizontal':
-            for x in range(self.width):
-                ratio = x / self.width
-                r = int(colors[0][0] * (1 - ratio) + colors[1][0] * ratio)
-                g = int(colors[0][1] * (1 - ratio) + colors[1][1] * ratio)
-                b = int(colors[0][2] * (1 - ratio) + colors[1][2] * ratio)
-                draw.line([(x, 0), (x, self.height)], fill=(r, g, b))
+            view = np.broadcast_to(lut[None, :, :], (self.height, self.width, 3))
         else:  # vertical
-            for y in range(self.height):
-                ratio = y / self.height
-                r = int(colors[0][0] * (1 - ratio) + colors[1][0] * ratio)
-                g = int(colors[0][1] * (1 - ratio) + colors[1][1] * ratio)
-                b = int(colors[0][2] * (1 - ratio) + colors[1][2] * ratio)
-                draw.line([(0, y), (self.width, y)], fill=(r, g, b))
+            view = np.broadcast_to(lut[:, None, :], (self.height, self.width, 3))
 
-        return img
+        img_array = np.ascontiguousarray(view)
+        return Image.frombuffer('RGB', (self.width, self.height), img_array, 'raw', 'RGB', 0, 1)
 
     def generate_perlin_noise(self, scale=100, octaves=6):
         """Generate Perlin-like noise pattern"""
         print(f"Generating {self.width}x{self.height} noise pattern...")
 
-        noise = np.zeros((self.height, self.width, 3), dtype=np.float32)
+        try:
+            import cv2
+        except ImportError:
+            cv2 = None
+
+        # Integer octave weights 255 // 2**octave sum to < 510, so layers fit in uint16
+        noise = np.zeros((self.height, self.width, 3), dtype=np.uint16)
+        scratch = np.empty((self.height, self.width, 3), dtype=np.uint8) if cv2 is not None else None
 
-        for octave in range(octaves):
+        octave_range = range(octaves)
+        try:
+            from tqdm import tqdm
+            octave_range = tqdm(octave_range, desc="Octaves", unit="octave")
+        except ImportError:
+            pass
+
+        for octave in octave_range:
             freq = 2 ** octave
-            amp = 1.0 / freq
+            weight = 255 // freq
 
             h = self.height // freq + 1
             w = self.width // freq + 1
-            octave_noise = np.random.rand(h, w, 3) * 255 * amp
+            # Sample the amplitude-scaled octave directly as uint8, with no float temporary
+            octave_noise = np.random.randint(0, weight + 1, size=(h, w, 3), dtype=np.uint8)
 
-            octave_img = Image.fromarray(octave_noise.astype(np.uint8))
-            octave_img = octave_img.resize((self.width, self.height), Image.BILINEAR)
+            if cv2 is not None:
+                cv2.resize(octave_noise, (self.width, self.height), dst=scratch,
+                           interpolation=cv2.INTER_LINEAR)
+                layer = scratch
+            else:
+                octave_img = Image.fromarray(octave_noise)
+                layer = np.asarray(octave_img.resize((self.width, self.height), Image.BILINEAR))
 
-            noise += np.array(octave_img)
+            np.add(noise, layer, out=noise)
 
-        noise = np.clip(noise, 0, 255).astype(np.uint8)
+        noise = np.minimum(noise, 255).astype(np.uint8)
         return Image.fromarray(noise)
 
     def generate_geometric(self, shape_type='circles', num_shapes=100):
@@ -85,6 +228,8 @@ class HighResImageGenerator:
         for _ in range(num_shapes):
             color = tuple(random.randint(0, 255) for _ in range(3))
 
+            # ImageDraw rasterizes each shape in C; per-row or masked NumPy
+            # fills of the same discs measured several times slower
             if shape_type == 'circles':
                 x = random.randint(0, self.width)
                 y = random.randint(0, self.height)
@@ -112,37 +257,65 @@ class HighResImageGenerator:
         """Generate Voronoi diagram"""
         print(f"Generating {self.width}x{self.height} Voronoi pattern...")
 
-        points = [(random.randint(0, self.width),
-                   random.randint(0, self.height),
-                   tuple(random.randint(0, 255) for _ in range(3)))
-                  for _ in range(num_points)]
-
         img_array = np.zeros((self.height, self.width, 3), dtype=np.uint8)
 
-        chunk_size = 1000
-
-        for y_start in range(0, self.height, chunk_size):
-            y_end = min(y_start + chunk_size, self.height)
-            for x_start in range(0, self.width, chunk_size):
-                x_end = min(x_start + chunk_size, self.width)
-
-                for y in range(y_start, y_end):
-                    for x in range(x_start, x_end):
-                        min_dist = float('inf')
-                        closest_color = (0, 0, 0)
-
-                        for px, py, color in points:
-                            dist = (x - px) ** 2 + (y - py) ** 2
-                            if dist < min_dist:
-                                min_dist = dist
-                                closest_color = color
-
-                        img_array[y, x] = closest_color
-
-            progress = ((y_end / self.height) * 100)
-            print(f"Progress: {progress:.1f}%", end='\r')
-
-        print("\nVoronoi generation complete!")
+        # No sites: nothing to colour, and the nearest-site code needs at least one
+        if num_points <= 0:
+            print("Voronoi generation complete!")
+            return Image.fromarray(img_array)
+
+        # Sites as structure-of-arrays: coordinates and colors in flat NumPy arrays
+        px = np.random.randint(0, self.width + 1, size=num_points, dtype=np.int32)
+        py = np.random.randint(0, self.height + 1, size=num_points, dtype=np.int32)
+        colors = np.random.randint(0, 256, size=(num_points, 3), dtype=np.uint8)
+
+        cKDTree = None
+        if num_points > KDTREE_MIN_POINTS:
+            try:
+                from scipy.spatial import cKDTree
+            except ImportError:
+                pass
+
+        if cKDTree is not None:
+            # O(log N) nearest-site lookups pay off once there are many sites
+            tree = cKDTree(np.column_stack([px, py]))
+
+            # Reuse one float64 (rows, width, 2) coordinate grid, the dtype the
+            # tree queries in, so each band allocates only the query results
+            chunk_size = 128
+            grid = np.empty((min(chunk_size, self.height), self.width, 2), dtype=np.float64)
+            grid[..., 0] = np.arange(self.width)
+
+            for y_start in range(0, self.height, chunk_size):
+                y_end = min(y_start + chunk_size, self.height)
+                band = grid[:y_end - y_start]
+                band[..., 1] = np.arange(y_start, y_end)[:, None]
+
+                _, best = tree.query(band, k=1, workers=-1)
+                img_array[y_start:y_end] = colors[best]
+        elif (voronoi_kernel := _get_voronoi_kernel()) is not None:
+            voronoi_kernel(px, py, colors, img_array)
+        else:
+            # NumPy fallback: scan all sites per band, keeping the nearest so far
+            chunk_size = 1000
+            xs = np.arange(self.width, dtype=np.int64)[None, :]
+
+            for y_start in range(0, self.height, chunk_size):
+                y_end = min(y_start + chunk_size, self.height)
+                ys = np.arange(y_start, y_end, dtype=np.int64)[:, None]
+
+                best_dist = np.full((y_end - y_start, self.width), np.iinfo(np.int64).max)
+                best = np.zeros((y_end - y_start, self.width), dtype=np.intp)
+
+                for k in range(num_points):
+                    dist = (xs - px[k]) ** 2 + (ys - py[k]) ** 2
+                    closer = dist < best_dist
+                    best_dist[closer] = dist[closer]
+                    best[closer] = k
+
+                img_array[y_start:y_end] = colors[best]
+
+        print("Voronoi generation complete!")
         return Image.fromarray(img_array)
 
     def generate_fractal(self, fractal_type='mandelbrot'):
@@ -156,33 +329,41 @@ class HighResImageGenerator:
             y_min, y_max = -2.0, 2.0
             max_iter = 256
 
-            for py in range(self.height):
-                for px in range(self.width):
-                    x0 = x_min + (x_max - x_min) * px / self.width
-                    y0 = y_min + (y_max - y_min) * py / self.height
+            # One palette entry per iteration count; points inside the set are black
+            palette = _hsv_to_rgb(np.arange(max_iter + 1, dtype=np.float64) / max_iter)
+            palette[max_iter] = 0
+
+            x = x_min + (x_max - x_min) * np.arange(self.width, dtype=np.float64) / self.width
+            y = y_min + (y_max - y_min) * np.arange(self.height, dtype=np.float64) / self.height
 
-                    x, y = 0, 0
-                    iteration = 0
+            # The set is symmetric about the real axis: for a view centred on it,
+            # row j mirrors row height - j, so only row 0 and the y >= 0 half
+            # need iterating
+            mirror = y_min == -y_max
+            half = (self.height + 1) // 2
+            if mirror:
+                rows = np.concatenate(([0], np.arange(half, self.height)))
+            else:
+                rows = np.arange(self.height)
 
-                    while x*x + y*y <= 4 and iteration < max_iter:
-                        xtemp = x*x - y*y + x0
-                        y = 2*x*y + y0
-                        x = xtemp
-                        iteration += 1
+            # Iterate in horizontal bands so the complex working set stays bounded
+            chunk_size = 256
+            cp = _get_cupy()
 
-                    if iteration == max_iter:
-                        color = (0, 0, 0)
-                    else:
-                        hue = iteration / max_iter
-                        rgb = colorsys.hsv_to_rgb(hue, 1.0, 1.0)
-                        color = tuple(int(c * 255) for c in rgb)
+            for start in range(0, len(rows), chunk_size):
+                band = rows[start:start + chunk_size]
 
-                    img_array[py, px] = color
+                if cp is not None:
+                    iters = _mandelbrot_iters_gpu(cp, x, y[band], max_iter)
+                else:
+                    iters = _mandelbrot_iters(x, y[band], max_iter)
 
-                if py % 100 == 0:
-                    print(f"Progress: {(py/self.height)*100:.1f}%", end='\r')
+                img_array[band] = palette[iters]
 
-        print("\nFractal generation complete!")
+            if mirror and half > 1:
+                img_array[1:half] = img_array[self.height - 1:self.height - half:-1]
+
+        print("Fractal generation complete!")
         return Image.fromarray(img_array)
 
     def generate_plasma(self):
@@ -191,30 +372,32 @@ class HighResImageGenerator:
 
         img_array = np.zeros((self.height, self.width, 3), dtype=np.uint8)
 
-        for y in range(self.height):
-            for x in range(self.width):
-                value = (
-                        np.sin(x / 50.0) +
-                        np.sin(y / 50.0) +
-                        np.sin((x + y) / 50.0) +
-                        np.sin(np.sqrt(x*x + y*y) / 50.0)
-                )
+        x = np.arange(self.width, dtype=np.float32)[None, :]
+
+        chunk_size = 1000
 
-                value = (value + 4) / 8
+        for y_start in range(0, self.height, chunk_size):
+            y_end = min(y_start + chunk_size, self.height)
+            y = np.arange(y_start, y_end, dtype=np.float32)[:, None]
 
-                hue = value
-                rgb = colorsys.hsv_to_rgb(hue, 1.0, 1.0)
-                img_array[y, x] = tuple(int(c * 255) for c in rgb)
+            value = (
+                    np.sin(x / 50.0) +
+                    np.sin(y / 50.0) +
+                    np.sin((x + y) / 50.0) +
+                    np.sin(np.sqrt(x*x + y*y) / 50.0)
+            )
 
-            if y % 100 == 0:
-                print(f"Progress: {(y/self.height)*100:.1f}%", end='\r')
+            hue = (value + 4) / 8
+            img_array[y_start:y_end] = _hue_to_rgb(hue)
 
-        print("\nPlasma generation complete!")
+        print("Plasma generation complete!")
         return Image.fromarray(img_array)
 
     def save_image(self, img, filename=None, format='PNG', compress=False):
         """Save generated image"""
         if filename is None:
+            from datetime import datetime
+
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"generated_{self.width}x{self.height}_{timestamp}"
 
@@ -222,7 +405,17 @@ class HighResImageGenerator:
 
         if format.upper() == 'TIFF' and not compress:
             filepath = f"output/{filename}.tiff"
-            img.save(filepath, compression=None)
+            try:
+                import tifffile
+            except ImportError:
+                tifffile = None
+
+            if tifffile is not None:
+                # Tiled BigTIFF written straight from the pixel buffer
+                tifffile.imwrite(filepath, np.asarray(img), photometric='rgb',
+                                 compression=None, tile=(256, 256), bigtiff=True)
+            else:
+                img.save(filepath, compression=None)
         elif format.upper() == 'PNG':
             filepath = f"output/{filename}.png"
             img.save(filepath, optimize=not compress)